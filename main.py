@@ -1,19 +1,105 @@
 import argparse
+import functools
 import logging
+import os
 import json
 from logging.handlers import RotatingFileHandler
+from operator import itemgetter
 import threading
+import queue
+from concurrent.futures import ThreadPoolExecutor
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import time
 import yaml
 import re
-from urllib.parse import quote, urlparse, parse_qs
-from tabulate import tabulate
+from urllib.parse import quote
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 
 # https://docs.ntfy.sh/publish
 
 
+# Shared session so polls and notifications reuse keep-alive connections
+SESSION = requests.Session()
+SESSION.headers.update({"User-Agent": "Mozilla/5.0", "Connection": "keep-alive"})
+
+
+def mount_http_adapter(pool_maxsize=16):
+    adapter = HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=pool_maxsize,
+        # the only retries for API polls, with exponential backoff; POSTs
+        # aren't retried on read errors so notifications aren't duplicated
+        max_retries=Retry(
+            total=2,
+            backoff_factor=0.3,
+            status_forcelist=[500, 502, 503, 504],
+            allowed_methods=["GET"],
+            respect_retry_after_header=True,
+        ),
+    )
+    # plain http too, so self-hosted ntfy servers get the same pooling
+    SESSION.mount("https://", adapter)
+    SESSION.mount("http://", adapter)
+
+
+mount_http_adapter()
+
+# The ntfy listener holds a streaming response open indefinitely, so it gets
+# its own session instead of tying up a slot in the shared pool
+LISTEN_SESSION = requests.Session()
+LISTEN_SESSION.headers.update({"User-Agent": "Mozilla/5.0"})
+# (connect, read); ntfy sends a keepalive line every 45 seconds by default, so
+# a read timeout well above that only fires on a dead connection
+LISTEN_TIMEOUT = (10, 120)
+
+
+def json_loads(data):
+    return orjson.loads(data) if orjson else json.loads(data)
+
+
+def json_dumps(obj):
+    """Serializes obj to indented UTF-8 JSON bytes."""
+    if orjson:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    return json.dumps(obj, indent=2, ensure_ascii=False).encode("utf-8")
+
+
+_NON_DIGIT = re.compile(r"[^0-9]")
+_NON_ALPHA = re.compile(r"[^A-Za-z]")
+_REGION_LANG = re.compile(r"(ca)/(en)([A-Za-z0-9\-/]+)?")
+_PRODUCT_ID = re.compile(r"products/([\dA-Z\-]+)")
+# "<url> name:<name>" listener messages
+_ADD_LINE = re.compile(r"(www\.uniqlo\.com\S+?)\s*name:\s*(.*)")
+_QUERY_PARAM = re.compile(
+    r"[?&](colorCode|sizeCode|colorDisplayCode|sizeDisplayCode)=([^&#]+)"
+)
+
+# api_url -> {"etag", "last_modified", "data", "expires_at"}
+RESPONSE_CACHE = dict()
+RESPONSE_CACHE_LOCK = threading.Lock()
+RESPONSE_CACHE_MAXSIZE = 512
+# api_url -> lock held while that url is being fetched
+FETCH_LOCKS = dict()
+
+# seconds to wait for more product list changes before writing products.json
+SAVE_DELAY = 1
+save_timer = None
+
+# (connect, read) for ntfy POSTs, so a hung server can't block a worker forever
+NOTIFY_TIMEOUT = (10, 30)
+
+# one queue per notification_worker; a product's notifications always go to
+# the same queue so they are posted in the order they were raised
+NOTIFY_QUEUES = []
+
+
 def setup_logger():
     logger = logging.getLogger("uniqlo_monitor")
     logger.setLevel(logging.INFO)
@@ -39,34 +125,34 @@ def setup_logger():
     return logger
 
 
+@functools.lru_cache(maxsize=1024)
 def parse_product_url(url):
-    parsed_url = urlparse(url)
-    params = parse_qs(parsed_url.query)
-
-    color_code = params.get("colorCode", [None])[0]
-    size_code = params.get("sizeCode", [None])[0]
-    color_display_code = params.get("colorDisplayCode", [None])[0]
-    size_display_code = params.get("sizeDisplayCode", [None])[0]
+    params = dict()
+    for name, value in _QUERY_PARAM.findall(url):
+        # first occurrence wins, like parse_qs(...)[name][0]
+        params.setdefault(name, value)
+
+    color_code = params.get("colorCode")
+    size_code = params.get("sizeCode")
+    color_display_code = params.get("colorDisplayCode")
+    size_display_code = params.get("sizeDisplayCode")
     if color_display_code is None:
-        color_display_code = re.sub("[^0-9]", "", color_code) if color_code else None
+        color_display_code = _NON_DIGIT.sub("", color_code) if color_code else None
 
     if size_display_code is None:
-        size_display_code = re.sub("[^0-9]", "", size_code) if size_code else None
+        size_display_code = _NON_DIGIT.sub("", size_code) if size_code else None
 
     return color_display_code, size_display_code
 
 
+@functools.lru_cache(maxsize=1024)
 def get_api_url(url):
-    region = "ca"
-    language = "en"
-    reg = re.compile(f"({region})\\/({language})([A-Za-z0-9\\-\\/]+)?")
-    matches = reg.search(url)
+    matches = _REGION_LANG.search(url)
     if not matches:
         return None
     base_api_url = "https://www.uniqlo.com/ca/api/commerce/v3/en/"
     uri = matches.group(3) or "/"
-    product_reg = re.compile(r"products\/([\dA-Z\-]+)")
-    product_matches = product_reg.search(uri)
+    product_matches = _PRODUCT_ID.search(uri)
     if product_matches:
         # PDP
         id = product_matches.group(1)
@@ -77,24 +163,118 @@ def get_api_url(url):
     return api_url
 
 
-def get_response(api_url, max_retries=3, retry_delay=5):
-    retries = 0
-    while retries < max_retries:
+def get_response(api_url, headers=None):
+    # retries with backoff are handled by the session's HTTPAdapter
+    response = SESSION.get(api_url, headers=headers, timeout=api_timeout)
+    response.raise_for_status()
+    return response
+
+
+def get_cached_json(api_url, prepare=None):
+    """
+    Returns the parsed JSON body for api_url, reusing a cached copy while it is
+    fresh and revalidating it with ETag/Last-Modified once it expires. Falls
+    back to the stale copy if the API is unreachable.
+
+    If given, prepare is applied to each freshly parsed body and its result is
+    what gets cached and returned.
+    """
+    with RESPONSE_CACHE_LOCK:
+        fetch_lock = FETCH_LOCKS.get(api_url)
+        if fetch_lock is None:
+            if len(FETCH_LOCKS) >= RESPONSE_CACHE_MAXSIZE:
+                # evict the oldest url's lock and cached response together
+                oldest = next(iter(FETCH_LOCKS))
+                del FETCH_LOCKS[oldest]
+                RESPONSE_CACHE.pop(oldest, None)
+            fetch_lock = FETCH_LOCKS[api_url] = threading.Lock()
+
+    # one fetch per api_url at a time, so products tracked in several colors
+    # or sizes share a single request per cycle instead of racing each other
+    with fetch_lock:
+        with RESPONSE_CACHE_LOCK:
+            cached = RESPONSE_CACHE.get(api_url)
+        if cached and cached["expires_at"] > time.monotonic():
+            return cached["data"]
+
+        headers = {}
+        if cached:
+            if cached["etag"]:
+                headers["If-None-Match"] = cached["etag"]
+            if cached["last_modified"]:
+                headers["If-Modified-Since"] = cached["last_modified"]
+
         try:
-            response = requests.get(
-                api_url, headers={"User-Agent": "Mozilla/5.0"}, timeout=10
-            )
-            response.raise_for_status()
-            return response
+            response = get_response(api_url, headers=headers)
         except requests.RequestException as e:
-            retries += 1
-            if retries == max_retries:
-                raise e
-            else:
-                time.sleep(retry_delay)
-                print(
-                    f"Retrying in {retry_delay} seconds... (Attempt {retries}/{max_retries})"
-                )
+            # only ride out outages (connection errors, timeouts, 5xx); a 404
+            # for a delisted product must surface instead of serving old stock
+            status = e.response.status_code if e.response is not None else None
+            if not cached or (status is not None and status < 500):
+                raise
+            logger.warning("Using stale response for %s: %s", api_url, e)
+            return cached["data"]
+
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if response.status_code == 304 and cached:
+            data = cached["data"]
+            # a 304 may omit the validators; keep revalidating with the old ones
+            etag = etag or cached["etag"]
+            last_modified = last_modified or cached["last_modified"]
+        else:
+            data = json_loads(response.content)
+            if prepare:
+                data = prepare(data)
+
+        with RESPONSE_CACHE_LOCK:
+            RESPONSE_CACHE.pop(api_url, None)
+            if len(RESPONSE_CACHE) >= RESPONSE_CACHE_MAXSIZE:
+                # evict the least recently stored entry, and its lock with it
+                oldest = next(iter(RESPONSE_CACHE))
+                del RESPONSE_CACHE[oldest]
+                FETCH_LOCKS.pop(oldest, None)
+            RESPONSE_CACHE[api_url] = {
+                "etag": etag,
+                "last_modified": last_modified,
+                "data": data,
+                "expires_at": time.monotonic() + refresh_time // 2,
+            }
+        return data
+
+
+def index_product(response_json):
+    """
+    Indexes the product's variants by (color display code, size display code)
+    and its main images by color code. A None in either variant key position
+    matches any value, mirroring the first-match behaviour of scanning l2s in
+    order.
+
+    Only the fields get_info_from_api reads are kept, so the rest of the
+    (large) response can be freed instead of sitting in RESPONSE_CACHE.
+    "prices" starts empty and is filled lazily by get_info_from_api, keyed
+    like "variants", so the raw l2s dicts are never written to.
+    """
+    product_dict = response_json["result"]["items"][0]
+    colors = product_dict["colors"]
+    sizes = product_dict["sizes"]
+    variants = dict()
+    for variant in product_dict["l2s"]:
+        color = variant["color"]["displayCode"]
+        size = variant["size"]["displayCode"]
+        for key in ((color, size), (color, None), (None, size), (None, None)):
+            variants.setdefault(key, variant)
+    image_by_color = dict()
+    for image in product_dict["images"]["main"]:
+        image_by_color.setdefault(image["colorCode"], image["url"])
+    return {
+        "name": product_dict["name"],
+        "color_code_prefix": _NON_ALPHA.sub("", colors[0]["code"]) if colors else None,
+        "size_code_prefix": _NON_ALPHA.sub("", sizes[0]["code"]) if sizes else None,
+        "variants": variants,
+        "image_by_color": image_by_color,
+        "prices": dict(),
+    }
 
 
 # https://www.uniqlo.com/ca/api/commerce/v3/en/products/E463985-000
@@ -112,87 +292,71 @@ def get_info_from_api(
         image_url: str | None
     """
     try:
-        response = get_response(api_url)
+        indexed = get_cached_json(api_url, prepare=index_product)
     except requests.RequestException as e:
-        logger.error(f"Failed to get response from API: {e}")
+        logger.error("Failed to get response from API: %s", e)
+        return None
+    except (KeyError, IndexError, TypeError, ValueError) as e:
+        # e.g. a category (CMS) page, which has no product items
+        logger.error("Unexpected API response for %s: %r", api_url, e)
         return None
 
-    product_dict = response.json()["result"]["items"][0]
-    color_code_prefix = (
-        re.sub("[^A-Za-z]", "", product_dict["colors"][0]["code"])
-        if color_display_code
-        else None
-    )
-    size_code_prefix = (
-        re.sub("[^A-Za-z]", "", product_dict["sizes"][0]["code"])
-        if size_display_code
-        else None
-    )
+    variant_key = (color_display_code, size_display_code)
+    variant = indexed["variants"].get(variant_key)
+    if variant is None:
+        return None
 
-    images = product_dict["images"]["main"]
-    color_size_list = product_dict["l2s"]
-    for variant in color_size_list:
-        if (
-            variant["color"]["displayCode"] == color_display_code
-            or color_display_code is None
-        ) and (
-            variant["size"]["displayCode"] == size_display_code
-            or size_display_code is None
-        ):
-            prices = variant["prices"]
-            # prices are either base or promo
-            price = (
-                float(prices["promo"]["value"])
-                if prices["promo"]
-                else float(prices["base"]["value"])
-            )
+    color_code_prefix = indexed["color_code_prefix"] if color_display_code else None
+    size_code_prefix = indexed["size_code_prefix"] if size_display_code else None
+
+    stock = variant["stock"]
+    color = variant["color"]
+    size = variant["size"]
+    prices = variant["prices"]
+    promo = prices["promo"]
+
+    # prices are either base or promo; only the tracked variant is converted,
+    # once per fresh response, and cache hits reuse the memoized float
+    price = indexed["prices"].get(variant_key)
+    if price is None:
+        price = indexed["prices"][variant_key] = float(
+            promo["value"] if promo else prices["base"]["value"]
+        )
 
-            # variant["stock"]["transitStatus"] might be insteresting
-            # actual name is at response.json()["result"]["items"][0]["name"]
-            return (
-                {
-                    "price": price,
-                    "statusCode": variant["stock"]["statusCode"],
-                    "statusLocalized": variant["stock"]["statusLocalized"],
-                    "quantity": variant["stock"]["quantity"],
-                    "is_promo": bool(prices["promo"]),
-                    "color_name": variant["color"]["name"]
-                    if color_display_code is not None
-                    else "",
-                    "size_name": variant["size"]["name"]
-                    if size_display_code is not None
-                    else "",
-                    "image_url": next(
-                        filter(
-                            lambda image_dict: image_dict["colorCode"]
-                            == color_display_code,
-                            images,
-                        ),
-                        {"url": ""},
-                    )["url"],
-                    "name": product_dict["name"],
-                },
-                color_code_prefix,
-                size_code_prefix,
-            )
-    return None
+    # stock["transitStatus"] might be insteresting
+    # actual name is at response.json()["result"]["items"][0]["name"]
+    return (
+        {
+            "price": price,
+            "statusCode": stock["statusCode"],
+            "statusLocalized": stock["statusLocalized"],
+            "quantity": stock["quantity"],
+            "is_promo": bool(promo),
+            "color_name": color["name"] if color_display_code is not None else "",
+            "size_name": size["name"] if size_display_code is not None else "",
+            "image_url": indexed["image_by_color"].get(color_display_code, ""),
+            "name": indexed["name"],
+        },
+        color_code_prefix,
+        size_code_prefix,
+    )
 
 
-def get_info(url, max_retries=5):
+def get_info(url):
     api_url = get_api_url(url)
     color_display_code, size_display_code = parse_product_url(url)
 
-    result = None
-    for _ in range(max_retries):
-        result = get_info_from_api(api_url, color_display_code, size_display_code)
-        if result is not None:
-            break
-
-    if result is None:  # if result is still None after max_retries
+    result = get_info_from_api(api_url, color_display_code, size_display_code)
+    if result is None:
         return None
 
     info, color_code_prefix, size_code_prefix = result
+    return info, get_modified_url(url, color_code_prefix, size_code_prefix)
 
+
+@functools.lru_cache(maxsize=1024)
+def get_modified_url(url, color_code_prefix, size_code_prefix):
+    color_display_code, size_display_code = parse_product_url(url)
     modified_url = url.split("?", 1)[0]
 
     def next_delimiter(url):
@@ -206,7 +370,21 @@ def get_info(url, max_retries=5):
         modified_url += f"{next_delimiter(modified_url)}sizeCode={size_code_prefix}{size_display_code}"
         # modified_url += f"{next_delimiter(modified_url)}sizeDisplayCode={size_display_code}"
 
-    return info, modified_url
+    return modified_url
+
+
+def safe_get_info(url):
+    # keep one product's failure from aborting the whole concurrent poll
+    try:
+        return get_info(url)
+    except Exception:
+        logger.exception("Unable to retrieve product info for %s", url)
+        return None
+
+
+def get_infos(urls):
+    """Polls urls concurrently and returns {url: get_info(url)}."""
+    return dict(zip(urls, poll_executor.map(safe_get_info, urls)))
 
 
 def send_ntfy_notification(
@@ -225,23 +403,59 @@ def send_ntfy_notification(
     if show_image and product_info["image_url"]:
         headers["Attach"] = product_info["image_url"]
 
-    r = requests.post(f"{args.server}/{topic}", data=message, headers=headers)
+    # posted by notification_worker so a slow ntfy server doesn't stall polling
+    key = headers.get("Click", title)
+    NOTIFY_QUEUES[hash(key) % len(NOTIFY_QUEUES)].put(
+        {"url": f"{args.server}/{topic}", "message": message, "headers": headers}
+    )
+
+
+def post_ntfy_notification(url, message, headers):
+    try:
+        r = SESSION.post(url, data=message, headers=headers, timeout=NOTIFY_TIMEOUT)
+    except requests.RequestException as e:
+        logger.error("Failed to send notification: %s", e)
+        return
     if r.status_code != 200:
-        logger.error(f"Failed to send notification: {r.text}")
+        logger.error("Failed to send notification: %s", r.text)
+
+
+def notification_worker(notify_queue):
+    while True:
+        item = notify_queue.get()
+        # never let one bad notification (e.g. a header http.client can't
+        # encode) kill the worker and strand everything queued behind it
+        try:
+            post_ntfy_notification(**item)
+        except Exception:
+            logger.exception("Failed to send notification: %s", item["headers"])
+        finally:
+            notify_queue.task_done()
+
+
+def render_strings(info):
+    """Builds the strings shared by the notifications for a product."""
+    full_name = f"{info['name']} ({info['color_name']}) - {info['nickname']}"
+    price_str = f"{info['price']}" + (" (Sale)" if info["is_promo"] else "")
+    return {
+        "full_name": full_name,
+        "price_str": price_str,
+        "summary": f"Price: {price_str}, Quantity: {info['quantity']}, {info['color_name']}, {info['size_name']}",
+        "low_stock_title": f"{full_name} is LOW on stock",
+        "out_of_stock_title": f"{full_name} is OUT OF STOCK",
+    }
 
 
 def notify_product_added(product):
-    product_full_name = (
-        f"{product['name']} ({product['color_name']}) - {product['nickname']}"
-    )
+    strings = render_strings(product)
+    product_full_name = strings["full_name"]
     title = f"{product_full_name} Added"
     priority = 3
     tags = None
-    price_str = f"{product['price']}" + (" (Sale)" if product["is_promo"] else "")
-    msg = f"Price: {price_str}, Quantity: {product['quantity']}, {product['color_name']}, {product['size_name']}"
+    msg = strings["summary"]
 
     if product["statusCode"] == "LOW_STOCK":
-        title = f"{product_full_name} is LOW on stock"
+        title = strings["low_stock_title"]
         priority = 4
         tags = "warning"
         if product["quantity"] <= 3:
@@ -250,7 +464,7 @@ def notify_product_added(product):
             tags = "rotating_light"
 
     if product["statusCode"] == "STOCK_OUT":
-        title = f"{product_full_name} is OUT OF STOCK"
+        title = strings["out_of_stock_title"]
         priority = 4
         tags = "skull"
 
@@ -266,10 +480,11 @@ def notify_product_added(product):
 
 
 def initialize_product_history():
+    results = get_infos(list(product_urls))
     for url, nickname in product_urls.items():
-        res = get_info(url)
+        res = results[url]
         if not res:
-            logger.error(f"Unable to retrieve price for {url}")
+            logger.error("Unable to retrieve price for %s", url)
             continue
         info, url = res
 
@@ -280,12 +495,13 @@ def initialize_product_history():
             with product_history_lock:
                 product_history[url] = info
         else:
-            logger.error(f"Unable to retrieve price for {url}")
+            logger.error("Unable to retrieve price for %s", url)
 
     if not args.carry_on:
         with product_history_lock:
-            for product in product_history.values():
-                notify_product_added(product)
+            products = list(product_history.values())
+        for product in products:
+            notify_product_added(product)
 
 
 def process_new_products(info, url, nickname):
@@ -299,224 +515,357 @@ def process_new_products(info, url, nickname):
     notify_product_added(info)
 
 
+def format_table(rows, headers):
+    """
+    Renders rows of strings as an outlined, fixed-width text table, e.g.
+
+        +------+-------+
+        | Name | Stock |
+        +======+=======+
+        | Tee  | 3     |
+        +------+-------+
+    """
+    widths = [len(header) for header in headers]
+    for row in rows:
+        widths = [max(width, len(cell)) for width, cell in zip(widths, row)]
+
+    def format_row(row):
+        return "| " + " | ".join(c.ljust(w) for c, w in zip(row, widths)) + " |"
+
+    border = "+" + "+".join("-" * (w + 2) for w in widths) + "+"
+    lines = [border, format_row(headers), border.replace("-", "=")]
+    lines.extend(format_row(row) for row in rows)
+    lines.append(border)
+    return "\n".join(lines)
+
+
+def add_product(url, nickname, res):
+    if not res:
+        logger.error(
+            "Unable to retrieve product info for %s. You can try again or there might be an issue with the product URL or Uniqlo API.",
+            url,
+        )
+        return
+    info, url = res
+
+    if url in product_urls or url in product_history:
+        logger.info("Product already exists: %s", url)
+        return
+
+    process_new_products(info, url, nickname)
+
+    with product_urls_lock:
+        product_urls[url] = nickname
+        save_product_urls()
+    logger.info("Added product: %s - %s", url, nickname)
+
+
+def remove_product(url, res):
+    if res:
+        _, url = res
+
+    is_removed = False
+    with product_urls_lock:
+        if url in product_urls:
+            del product_urls[url]
+            save_product_urls()
+            is_removed = True
+
+    with product_history_lock:
+        if url in product_history:
+            del product_history[url]
+            is_removed = True
+
+    logger.info(
+        "Removed product: %s" if is_removed else "Product not found: %s", url
+    )
+
+
+def apply_product_changes(product_changes, results):
+    # applied in the order the listener received them, so an add followed by
+    # a remove of the same product leaves it removed
+    for action, url, nickname in product_changes:
+        if action == "add":
+            add_product(url, nickname, results[url])
+        else:
+            remove_product(url, results[url])
+
+
 def main():
     with product_urls_lock:
         initialize_product_history()
 
+    cycle = 0
     while True:
+        # adds/removes sent to the listener since the last cycle
+        product_changes = []
+        while True:
+            try:
+                product_changes.append(product_changes_queue.get_nowait())
+            except queue.Empty:
+                break
+
         # check for updates
         with product_history_lock:
-            for url, old_info in product_history.items():
-                res = get_info(url)
-                if not res:
-                    logger.error(f"Unable to retrieve updated info for {url}")
-                    continue
-                new_info, url = res
-
-                new_info["nickname"] = old_info["nickname"]
-                new_info["url"] = url
-
-                price_str = (
-                    f"{new_info['price']}" + " (Sale)" if new_info["is_promo"] else ""
-                )
-                product_full_name = f"{new_info['name']} ({new_info['color_name']}) - {new_info['nickname']}"
+            snapshot = list(product_history.items())
 
-                # check price
-                if new_info["price"] != old_info["price"]:
-                    price_diff = new_info["price"] - old_info["price"]
-                    msg = f"""
+        results = get_infos(
+            [url for url, _ in snapshot] + [url for _, url, _ in product_changes]
+        )
+        apply_product_changes(product_changes, results)
+        updates = dict()
+        for url, old_info in snapshot:
+            res = results[url]
+            if not res:
+                logger.error("Unable to retrieve updated info for %s", url)
+                continue
+            new_info, new_url = res
+
+            new_info["nickname"] = old_info["nickname"]
+            new_info["url"] = new_url
+            new_info["quantity_change"] = (
+                f"{old_info['quantity']} -> {new_info['quantity']}"
+                if old_info["quantity"] != new_info["quantity"]
+                else None
+            )
+            new_info["price_change"] = (
+                f"{old_info['price']} -> {new_info['price']}"
+                if old_info["price"] != new_info["price"]
+                else None
+            )
+            # most cycles change nothing; notification strings are only built
+            # for products where one of the watched fields moved
+            changed = (
+                new_info["price"] != old_info["price"]
+                or new_info["statusCode"] != old_info["statusCode"]
+                or new_info["quantity"] != old_info["quantity"]
+            )
+            updates[url] = (old_info, new_info, changed)
+
+        # apply the results and collect the table rows in a single pass; products
+        # removed by the listener while we were polling are dropped here
+        applied = dict()
+        infos = []
+        with product_history_lock:
+            for url, info in product_history.items():
+                change = updates.get(url)
+                if change is not None:
+                    info = product_history[url] = change[1]
+                    applied[url] = change
+                infos.append(info)
+            membership_changed = product_history.keys() != {
+                url for url, _ in snapshot
+            }
+
+        # notify outside the lock, the listener may be waiting on it
+        for old_info, new_info, changed in applied.values():
+            if not changed:
+                continue
+            strings = render_strings(new_info)
+            price_str = strings["price_str"]
+            product_full_name = strings["full_name"]
+
+            # check price
+            if new_info["price"] != old_info["price"]:
+                price_diff = new_info["price"] - old_info["price"]
+                msg = f"""
     Old price: {old_info['price']}
     New price: {new_info['price']}
     Price difference: {price_diff}"""
+                send_ntfy_notification(
+                    f"Price change for {product_full_name}",
+                    msg,
+                    topic,
+                    new_info,
+                    priority=4,
+                    tags="tada",
+                )
+
+            # check stock status
+            if new_info["statusCode"] != old_info["statusCode"]:
+                if new_info["statusCode"] == "LOW_STOCK":
                     send_ntfy_notification(
-                        f"Price change for {product_full_name}",
-                        msg,
+                        strings["low_stock_title"],
+                        strings["summary"],
                         topic,
                         new_info,
                         priority=4,
-                        tags="tada",
+                        tags="warning"
+                        if old_info["statusCode"] == "IN_STOCK"
+                        else "up,tada",
+                        show_image=True,
+                    )
+                elif new_info["statusCode"] == "STOCK_OUT":
+                    send_ntfy_notification(
+                        strings["out_of_stock_title"],
+                        " ",
+                        topic,
+                        new_info,
+                        priority=4,
+                        tags="skull",
                     )
 
-                # check stock status
-                if new_info["statusCode"] != old_info["statusCode"]:
-                    if new_info["statusCode"] == "LOW_STOCK":
-                        send_ntfy_notification(
-                            f"{product_full_name} is LOW on stock",
-                            f"Price: {price_str}, Quantity: {new_info['quantity']}, {new_info['color_name']}, {new_info['size_name']}",
-                            topic,
-                            new_info,
-                            priority=4,
-                            tags="warning"
-                            if old_info["statusCode"] == "IN_STOCK"
-                            else "up,tada",
-                            show_image=True,
-                        )
-                    elif new_info["statusCode"] == "STOCK_OUT":
-                        send_ntfy_notification(
-                            f"{product_full_name} is OUT OF STOCK",
-                            " ",
-                            topic,
-                            new_info,
-                            priority=4,
-                            tags="skull",
-                        )
-
-                # check quantity if low stock
-                if new_info["statusCode"] == "LOW_STOCK":
-                    if old_info["quantity"] > new_info["quantity"]:
-                        title = f"{product_full_name} - Quantity change"
-                        msg = f"Qunaity is down from {old_info['quantity']} to {new_info['quantity']} at Price: {price_str}"
-                        priority = 3
-                        tags = "small_red_triangle_down	"
-                        if new_info["quantity"] <= 3:
-                            title = f"{product_full_name} - ALMOST OUT OF STOCK"
-                            priority = 5
-                            tags = "rotating_light"
-                        send_ntfy_notification(
-                            title, msg, topic, new_info, priority=priority, tags=tags
-                        )
-                    elif old_info["quantity"] < new_info["quantity"]:
-                        send_ntfy_notification(
-                            f"{product_full_name} - Quantity change",
-                            f"Qunaity is up from {old_info['quantity']} to {new_info['quantity']} at Price: {price_str}",
-                            topic,
-                            new_info,
-                            tags="up",
-                        )
-
-                new_info["quantity_change"] = (
-                    f"{old_info['quantity']} -> {new_info['quantity']}"
-                    if old_info["quantity"] != new_info["quantity"]
-                    else None
-                )
-                product_history[url] = new_info
-
-                new_info["price_change"] = (
-                    f"{old_info['price']} -> {new_info['price']}"
-                    if old_info["price"] != new_info["price"]
-                    else None
-                )
+            # check quantity if low stock
+            if new_info["statusCode"] == "LOW_STOCK":
+                if old_info["quantity"] > new_info["quantity"]:
+                    title = f"{product_full_name} - Quantity change"
+                    msg = f"Qunaity is down from {old_info['quantity']} to {new_info['quantity']} at Price: {price_str}"
+                    priority = 3
+                    tags = "small_red_triangle_down	"
+                    if new_info["quantity"] <= 3:
+                        title = f"{product_full_name} - ALMOST OUT OF STOCK"
+                        priority = 5
+                        tags = "rotating_light"
+                    send_ntfy_notification(
+                        title, msg, topic, new_info, priority=priority, tags=tags
+                    )
+                elif old_info["quantity"] < new_info["quantity"]:
+                    send_ntfy_notification(
+                        f"{product_full_name} - Quantity change",
+                        f"Qunaity is up from {old_info['quantity']} to {new_info['quantity']} at Price: {price_str}",
+                        topic,
+                        new_info,
+                        tags="up",
+                    )
 
+        any_change = membership_changed or any(
+            changed for _, _, changed in applied.values()
+        )
+        # re-render the unchanged table only every few cycles
+        if (any_change or cycle % 10 == 0) and logger.isEnabledFor(logging.INFO):
+            infos.sort(key=itemgetter("quantity"))
             product_data = [
                 [
-                    info["nickname"],
+                    str(info["nickname"]),
                     info["name"],
-                    (info["quantity"], info["quantity_change"]),
-                    (info["price"], info["price_change"]),
+                    # products added mid-cycle have no change recorded yet
+                    info.get("quantity_change") or str(info["quantity"]),
+                    info.get("price_change") or str(info["price"]),
                     "Yes" if info["is_promo"] else "",
                     info["color_name"],
                     info["size_name"],
                     info["url"],
                 ]
-                for info in product_history.values()
+                for info in infos
             ]
-        quantity_idx = 2
-        product_data.sort(key=lambda x: x[quantity_idx][0])
-        for i, (_, _, (quantity, change), (price, price_change), *_) in enumerate(
-            product_data
-        ):
-            product_data[i][quantity_idx] = (
-                change if change is not None else str(quantity)
-            )
-            product_data[i][quantity_idx + 1] = (
-                price_change if price_change is not None else str(price)
-            )
-
-        logger.info(
-            "\n"
-            + tabulate(
-                product_data,
-                headers=[
-                    "Nickname",
-                    "Name",
-                    "Stock",
-                    "Price",
-                    "Sale",
-                    "Color",
-                    "Size",
-                    "URL",
-                ],
-                tablefmt="outline",
+            logger.info(
+                "\n%s",
+                format_table(
+                    product_data,
+                    headers=[
+                        "Nickname",
+                        "Name",
+                        "Stock",
+                        "Price",
+                        "Sale",
+                        "Color",
+                        "Size",
+                        "URL",
+                    ],
+                ),
             )
-        )
+        else:
+            logger.debug("No changes")
+        cycle += 1
 
-        time.sleep(refresh_time)
+        # sleep until the next cycle, or until the listener changes the list
+        wake_event.wait(timeout=refresh_time)
+        wake_event.clear()
 
 
 def parse_uniqlo_url(url):
     return "https://www.uniqlo.com" + url.split("www.uniqlo.com")[1]
 
 
+def save_product_urls():
+    # caller must hold product_urls_lock; bursts of changes are coalesced into
+    # a single write once things have been quiet for SAVE_DELAY seconds
+    global save_timer
+    if save_timer is not None:
+        save_timer.cancel()
+    save_timer = threading.Timer(SAVE_DELAY, flush_product_urls)
+    save_timer.start()
+
+
+def flush_product_urls():
+    with product_urls_lock:
+        data = json_dumps(product_urls)
+    # write to a temp file first so a crash never leaves products.json truncated
+    with open("products.json.tmp", "wb") as f:
+        f.write(data)
+    os.replace("products.json.tmp", "products.json")
+
+
+def handle_remove(rest):
+    if "www.uniqlo.com" not in rest:
+        return
+    # removed by the poll loop, in order with any pending adds
+    product_changes_queue.put(("remove", parse_uniqlo_url(rest.strip()), None))
+    wake_event.set()
+
+
+def handle_poll_interval(rest):
+    global refresh_time
+    try:
+        new_refresh_time = int(rest.strip())
+    except ValueError:
+        logger.error("Invalid poll interval: %s", rest)
+        return
+    if new_refresh_time <= 0:
+        logger.error("Invalid poll interval: %s", rest)
+        return
+    refresh_time = new_refresh_time
+    wake_event.set()
+    logger.info("Poll interval set to %s seconds", refresh_time)
+
+
+def handle_add(line_str):
+    match = _ADD_LINE.search(line_str)
+    if not match:
+        logger.info("Ignoring unrecognized listener message: %s", line_str)
+        return
+    url = "https://" + match.group(1)
+    # fetched and added by the poll loop, which is woken up right away
+    product_changes_queue.put(("add", url, match.group(2).strip()))
+    wake_event.set()
+
+
+# "<command>:<argument>" messages; anything else is treated as "<url> name:<name>"
+LISTEN_COMMANDS = {
+    "remove": handle_remove,
+    "poll_interval": handle_poll_interval,
+}
+
+
 def listen_to_ntfy(server, topic):
+    # reconnect whenever the stream drops or the server closes it, so the
+    # listener never silently stops taking commands
     while True:
         try:
-            response = requests.get(f"{server}/{topic}/raw", stream=True)
-            for line in response.iter_lines():
-                if line and "www.uniqlo.com" in (line_str := line.decode("utf-8")):
-                    if "remove:" in line_str:
-                        is_removed = False
-                        url = line_str.replace("remove:", "").strip()
-                        url = parse_uniqlo_url(url)
-
-                        res = get_info(url)
-                        if res:
-                            _, url = res
-
-                        with product_urls_lock:
-                            if url in product_urls:
-                                del product_urls[url]
-                                json.dump(
-                                    product_urls, open("products.json", "w"), indent=4
-                                )
-                                is_removed = True
-
-                        with product_history_lock:
-                            if url in product_history:
-                                del product_history[url]
-                                is_removed = True
-
-                        logger.info(
-                            f"Removed product: {url}"
-                            if is_removed
-                            else f"Product not found: {url}"
-                        )
-                    elif "name:" in line_str:
-                        url, nickname = line_str.split("name:", 1)
-                        url = parse_uniqlo_url(url.strip())
-                        nickname = nickname.strip()
-
-                        res = get_info(url)
-                        if not res:
-                            logger.error(
-                                f"Unable to retrieve product info for {url}. You can try again or there might be an issue with the product URL or Uniqlo API."
-                            )
-                            continue
-                        info, url = res
-
-                        if url in product_urls or url in product_history:
-                            logger.info(f"Product already exists: {url}")
-                            continue
-
-                        process_new_products(info, url, nickname)
-
-                        with product_urls_lock:
-                            product_urls[url] = nickname
-                            json.dump(
-                                product_urls, open("products.json", "w"), indent=4
-                            )
-                        logger.info(f"Added product: {url} - {nickname}")
-
+            with LISTEN_SESSION.get(
+                f"{server}/{topic}/raw", stream=True, timeout=LISTEN_TIMEOUT
+            ) as response:
+                response.raise_for_status()
+                response.encoding = "utf-8"
+                for line_str in response.iter_lines(decode_unicode=True):
+                    if not line_str:
+                        continue
+                    command, _, rest = line_str.partition(":")
+                    handler = LISTEN_COMMANDS.get(command.strip())
+                    if handler:
+                        handler(rest)
+                    else:
+                        handle_add(line_str)
+            logger.info("Listener stream closed, reconnecting in 5 seconds")
+            time.sleep(5)
         except requests.exceptions.RequestException as e:
-            logger.error(f"Server error: {e}")
+            logger.error("Server error: %s", e)
             logger.info("Retrying in 5 seconds")
             time.sleep(5)
-            continue
         except Exception as e:
-            logger.error(f"General Error in listener: {e}")
+            logger.error("General Error in listener: %s", e)
             logger.info("Retrying in 5 seconds")
             time.sleep(5)
-            continue
-        break
 
 
 if __name__ == "__main__":
@@ -537,14 +886,35 @@ if __name__ == "__main__":
     with open("config.yml", "r") as f:
         config = yaml.safe_load(f)
 
-    product_urls = json.load(open("products.json", "r"))
+    with open("products.json", "rb") as f:
+        product_urls = json_loads(f.read())
     refresh_time = config["refresh_time"]
     topic = config["ntfy_topic"]
     listen_topic = config["ntfy_listen_topic"]
+    # (connect, read) so a stalled response can't hold up a whole cycle
+    api_timeout = (config.get("connect_timeout", 3.05), config.get("read_timeout", 7))
 
     product_history = dict()
     product_history_lock = threading.Lock()
     product_urls_lock = threading.Lock()
+    wake_event = threading.Event()
+    product_changes_queue = queue.Queue()
+
+    max_workers = config.get("max_workers", min(16, len(product_urls) + 1))
+    notify_workers = max(1, config.get("notify_workers", 4))
+    poll_executor = ThreadPoolExecutor(max_workers=max_workers)
+    # one pooled connection per poll and notification worker, so threads
+    # never wait on (or discard) connections from the pool
+    mount_http_adapter(pool_maxsize=max_workers + notify_workers)
+
+    # several workers so a burst of notifications is posted concurrently
+    for _ in range(notify_workers):
+        NOTIFY_QUEUES.append(queue.Queue())
+        notify_thread = threading.Thread(
+            target=notification_worker, args=(NOTIFY_QUEUES[-1],)
+        )
+        notify_thread.daemon = True
+        notify_thread.start()
 
     listen_thread = threading.Thread(
         target=listen_to_ntfy, args=(args.server, listen_topic)